@@ -5,28 +5,64 @@ Contains all common classes and functions used by both toribot.py and ostobotti.
 """
 
 import re
-import json
+import csv
 import time
 import logging
 import os
 import random
-import copy
+import hashlib
+import gzip
 from datetime import datetime
 from threading import Thread, Event, Lock
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat, count
+from bisect import bisect_left, insort
+from collections import OrderedDict
 from pathlib import Path
 from html import unescape
+from urllib.parse import urlparse
 
 # Third-party imports
 try:
-    from flask import Flask, jsonify, request, send_from_directory
+    from flask import Flask, Blueprint, Response, current_app, jsonify, request, send_from_directory
+    from flask.json.provider import JSONProvider
     import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util import make_headers
+    from urllib3.util.retry import Retry
+    import orjson
     from PIL import Image
     from io import BytesIO
 except ImportError as e:
-    print(f"Error: Missing required package. Install with: pip install flask requests pillow openai")
+    print(f"Error: Missing required package. Install with: pip install flask requests pillow orjson openai")
     import sys
     sys.exit(1)
 
+# Optional C-based HTML parser; the regex paths are used when it is not installed
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+
+# OpenAI SDK (and the httpx client it is built on) is only needed when valuations are enabled
+try:
+    from openai import OpenAI
+    import httpx
+except ImportError:
+    OpenAI = None
+
+# Optional production WSGI server; Flask's built-in server is used when it is not installed
+try:
+    from waitress import serve as waitress_serve
+except ImportError:
+    waitress_serve = None
+
+# Optional response compression (Brotli/gzip, negotiated via Accept-Encoding)
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -34,39 +70,295 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# How often pending database changes are written to disk in the background
+DB_FLUSH_INTERVAL_SECONDS = 5
+
+# The change log is folded into the main database file once it is this large, or this old
+DB_COMPACT_WAL_BYTES = 10 * 1024 * 1024
+DB_COMPACT_INTERVAL_SECONDS = 10 * 60
+
+# Default number of new item pages fetched in parallel per poll (kept low to stay polite to Tori.fi)
+ITEM_FETCH_CONCURRENCY = 8
+
+# Listing pages polled in parallel by a multi-page fetch (each page then fetches its items in parallel too)
+PAGE_FETCH_CONCURRENCY = 3
+
+# HTTP connection pool sizing: hosts kept in the pool, and sockets per host
+HTTP_POOL_CONNECTIONS = 32
+HTTP_POOL_MAXSIZE = 64
+
+# Response statuses retried (with backoff, honouring Retry-After) by the HTTP adapter
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Cache header for downloaded images - filenames embed the item ID and image index, not the content,
+# and refreshing an item rewrites them in place; so cache briefly, then revalidate (ETag/Last-Modified -> 304)
+IMAGE_CACHE_CONTROL = 'public, max-age=300'
+
+# Cache header for GUI pages and stylesheets - they change between releases, so revalidate (ETag -> 304)
+STATIC_CACHE_CONTROL = 'no-cache'
+
+# Trailing item ID digits naming the image subdirectory (100 shards)
+IMAGE_SHARD_DIGITS = 2
+
+# Image file extensions kept as-is when saving downloads
+VALID_IMAGE_EXTENSIONS = frozenset({'jpg', 'jpeg', 'png', 'gif', 'webp'})
+
+# Leading bytes of image files that can be saved without re-encoding (WebP is checked separately)
+IMAGE_SIGNATURES = (b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n', b'GIF87a', b'GIF89a')
+# Bytes needed to recognise any of the above (WebP is checked at offset 8-12)
+IMAGE_SIGNATURE_LENGTH = 12
+
+# Read size when streaming image downloads to disk
+IMAGE_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Returned by ToriFetcher.fetch_listing_page for a 304 - distinct from an (empty) 200 body
+LISTING_UNCHANGED = object()
+
+# Item pages are read up to this size (typically ~200 KB; head + JSON-LD come first)
+ITEM_PAGE_MAX_BYTES = 512 * 1024
+
 # Regex pattern
 PRODUCT_ID_PATTERN = r'href=["\'][^"\']*?/recommerce/forsale/item/(\d+)'
 
+# Precompiled extraction patterns (used for every polled page)
+PRODUCT_ID_RE = re.compile(PRODUCT_ID_PATTERN)
+PRODUCT_ID_BYTES_RE = re.compile(PRODUCT_ID_PATTERN.encode('ascii'))
+TITLE_RE = re.compile(r'<h1[^>]*>(.*?)</h1>', re.DOTALL)
+DESCRIPTION_RES = (
+    re.compile(r'<meta\s+property="og:description"\s+content="([^"]*)"', re.IGNORECASE),
+    re.compile(r'<meta\s+name="description"\s+content="([^"]*)"', re.IGNORECASE),
+)
+LOCATION_RES = (
+    re.compile(r'"location"\s*:\s*"([^"]+)"', re.IGNORECASE),
+    re.compile(r'<span[^>]*location[^>]*>([^<]+)</span>', re.IGNORECASE),
+    re.compile(r'class="[^"]*location[^"]*"[^>]*>([^<]+)<', re.IGNORECASE),
+    re.compile(r'"address"[^}]*"locality"\s*:\s*"([^"]+)"', re.IGNORECASE),
+)
+SELLER_RES = (
+    re.compile(r'"seller"[^}]*"name"\s*:\s*"([^"]+)"', re.IGNORECASE),
+    re.compile(r'"sellerName"\s*:\s*"([^"]+)"', re.IGNORECASE),
+    re.compile(r'<span[^>]*seller[^>]*>([^<]+)</span>', re.IGNORECASE),
+    re.compile(r'class="[^"]*seller[^"]*"[^>]*>([^<]+)<', re.IGNORECASE),
+    re.compile(r'"advertiser"[^}]*"name"\s*:\s*"([^"]+)"', re.IGNORECASE),
+)
+IMAGE_RES = (
+    re.compile(r'"image"\s*:\s*"(https://[^"]+)"', re.IGNORECASE),
+    re.compile(r'"imageUrl"\s*:\s*"(https://[^"]+)"', re.IGNORECASE),
+)
+# Last-resort <img src> scan; the host/path check ('tori' / 'image') is done on the match, not in the pattern
+IMAGE_SRC_RE = re.compile(r'src="(https://[^"]+?\.(?:jpe?g|png|webp)(?:\?[^"]*)?)"', re.IGNORECASE)
+OG_IMAGE_RE = re.compile(r'<meta\s+property="og:image(?::url|:secure_url)?"\s+content="(https://[^"]+)"', re.IGNORECASE)
+TAG_RE = re.compile(r'<[^>]+>')
+
+# CSS selectors used instead of the regexes above when selectolax is available
+LDJSON_SELECTOR = 'script[type="application/ld+json"]'
+DESCRIPTION_SELECTORS = ('meta[property="og:description"]', 'meta[name="description"]')
+OG_IMAGE_SELECTOR = 'meta[property^="og:image"]'
+
+# Image URLs kept per item by the extractor
+MAX_ITEM_IMAGES = 5
+LDJSON_RE = re.compile(r'<script[^>]+type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.DOTALL | re.IGNORECASE)
+
+# Price lines in OpenAI valuation replies (ARVO: is the old single-price format)
+PRICE_RE = re.compile(r'(HINTA_UUTENA|ARVO_NYT|ARVO):\s*(\d+)', re.IGNORECASE)
+
+
+# Completed valuations kept in memory for reuse; the least recently used are dropped beyond this
+VALUATION_CACHE_MAX_ENTRIES = 2000
+
+# Connection limits and request timeout for the shared OpenAI HTTP client
+OPENAI_MAX_CONNECTIONS = 10
+OPENAI_TIMEOUT_SECONDS = 30
+
+# Spacing between Tori.fi page request starts across all fetch threads, plus up to this much random jitter
+FETCH_MIN_INTERVAL_SECONDS = 0.2
+FETCH_JITTER_SECONDS = 0.3
+
+# Default number of valuations in flight at once, and minimum spacing between request starts
+VALUATION_CONCURRENCY = 4
+VALUATION_MIN_INTERVAL_SECONDS = 0.5
+
+# Shared worker threads for background jobs (valuation runs, multi-page fetches, refreshes)
+BACKGROUND_WORKERS = 4
+
+# Response compression: preferred algorithms, smallest body worth compressing, and a CPU-friendly level
+COMPRESS_ALGORITHMS = ['br', 'gzip']
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_LEVEL = 4
+
+# Default WSGI server worker threads, and seconds before an idle client connection is dropped
+SERVER_THREADS = 8
+SERVER_CHANNEL_TIMEOUT = 30
+
+
+# Columns of the /api/save CSV export
+EXPORT_FIELDNAMES = ['id', 'title', 'description', 'price', 'location', 'url', 'discovered_at', 'valuation_status', 'price_estimate']
+
+
+def export_row(item):
+    """Build the CSV export row tuple for one item, in EXPORT_FIELDNAMES order"""
+    get = item.get
+    valuation = get('valuation') or {}
+    return (
+        get('id', ''),
+        get('title', ''),
+        get('description', ''),
+        get('price', ''),
+        get('location', ''),
+        get('url', ''),
+        get('discovered_at', ''),
+        valuation.get('status', ''),
+        valuation.get('price_estimate', '')
+    )
+
+
+class EchoWriter:
+    """File-like object whose write() just returns what it is given (for streaming csv output)"""
+    
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    """Yield the CSV export (rows from export_row()) line by line, header first"""
+    writer = csv.writer(EchoWriter())
+    yield writer.writerow(EXPORT_FIELDNAMES)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+class ResponseCache:
+    """Serialized JSON body cached until its key changes, served with an ETag
+    
+    Keys are cheap version values (e.g. ProductDatabase.version), so a cache hit
+    costs one comparison instead of re-reading and re-serializing the data.
+    """
+    
+    def __init__(self):
+        # Per-process prefix so ETags handed out by a previous run never match
+        self._etag_prefix = f"{os.getpid():x}-{time.time_ns():x}"
+        self._builds = count(1)
+        self._entry = None  # (key, body, etag, gzipped body or None), always replaced as a whole
+    
+    def _current(self, key, build_body):
+        """Return the entry for key, calling build_body() only when key has changed"""
+        entry = self._entry
+        if entry is None or entry[0] != key:
+            entry = (key, build_body(), f"{self._etag_prefix}-{next(self._builds)}", None)
+            self._entry = entry
+        return entry
+    
+    def get(self, key, build_body):
+        """Return (body, etag), calling build_body() only when key has changed"""
+        entry = self._current(key, build_body)
+        return entry[1], entry[2]
+    
+    def response(self, key, build_body):
+        """Build a JSON response for the current request (304 Not Modified if its ETag matches)
+        
+        With compression enabled, gzip clients get a gzipped copy that is also cached
+        per key; flask-compress leaves responses that already have a Content-Encoding alone.
+        """
+        entry = self._current(key, build_body)
+        body, etag = entry[1], entry[2]
+        if Compress is not None and len(body) >= COMPRESS_MIN_SIZE and request.accept_encodings['gzip']:
+            gzipped = entry[3]
+            if gzipped is None:
+                gzipped = gzip.compress(body, compresslevel=COMPRESS_LEVEL)
+                if self._entry is entry:
+                    self._entry = entry[:3] + (gzipped,)
+            response = Response(gzipped, mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+            response.headers['Vary'] = 'Accept-Encoding'
+            # Same suffix flask-compress gives the ETags of the responses it compresses
+            response.set_etag(f"{etag}:gzip")
+        else:
+            response = Response(body, mimetype='application/json')
+            response.set_etag(etag)
+        return response.make_conditional(request)
+
+
+def run_server(app, host, port, threads=SERVER_THREADS):
+    """Serve the Flask app with waitress if available, else the threaded Werkzeug server"""
+    if waitress_serve is not None:
+        logger.info(f"Serving with waitress ({threads} threads)")
+        waitress_serve(app, host=host, port=port, threads=threads, channel_timeout=SERVER_CHANNEL_TIMEOUT)
+    else:
+        logger.warning("waitress not installed - falling back to Flask development server")
+        app.run(host=host, port=port, debug=False, use_reloader=False, threaded=True)
+
+
+def enable_compression(app):
+    """Compress JSON/HTML/CSS responses with flask-compress if it is installed"""
+    if Compress is None:
+        logger.info("flask-compress not installed - responses are sent uncompressed")
+        return
+    app.config.update(
+        COMPRESS_ALGORITHM=COMPRESS_ALGORITHMS,
+        COMPRESS_MIN_SIZE=COMPRESS_MIN_SIZE,
+        COMPRESS_LEVEL=COMPRESS_LEVEL,
+        COMPRESS_BR_LEVEL=COMPRESS_LEVEL
+    )
+    Compress(app)
+
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson (compact output, keys not sorted)"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        """Build a JSON response without the str round-trip of the default provider"""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS),
+            mimetype='application/json'
+        )
+
 
 class SettingsManager:
     """Manages application settings with file persistence"""
     
-    def __init__(self, filename, default_settings):
+    def __init__(self, filename, default_settings, on_change=None):
         self.filename = filename
         self.default_settings = default_settings
+        self.on_change = on_change  # Optional callback run after settings are updated
         self.lock = Lock()
         self.settings = self._load_settings()
+        self._snapshot = self._build_snapshot(self.settings)
+    
+    @staticmethod
+    def _build_snapshot(settings):
+        """Copy settings one level deep so later updates never touch a published snapshot"""
+        return {key: dict(value) if isinstance(value, dict) else value for key, value in settings.items()}
     
     def _load_settings(self):
         """Load settings from file or create with defaults"""
         if os.path.exists(self.filename):
             try:
-                with open(self.filename, 'r', encoding='utf-8') as f:
-                    loaded = json.load(f)
-                    # Merge with defaults for any missing keys
-                    return self._merge_with_defaults(loaded)
+                with open(self.filename, 'rb') as f:
+                    loaded = orjson.loads(f.read())
+                # Merge with defaults for any missing keys
+                return self._merge_with_defaults(loaded)
             except Exception as e:
                 logger.error(f"Error loading settings: {e}. Using defaults.")
-                return self.default_settings.copy()
+                return self._fresh_defaults()
         else:
             logger.info("Settings file not found. Creating with defaults.")
             self._save_settings(self.default_settings)
-            return self.default_settings.copy()
+            return self._fresh_defaults()
+    
+    def _fresh_defaults(self):
+        """Copy of the defaults that can be updated without touching default_settings (sections are flat dicts)"""
+        return self._build_snapshot(self.default_settings)
     
     def _merge_with_defaults(self, loaded):
         """Merge loaded settings with defaults to handle missing keys"""
-        # Use deep copy to avoid mutating default_settings
-        result = copy.deepcopy(self.default_settings)
+        result = self._fresh_defaults()
         for key in loaded:
             if isinstance(loaded[key], dict) and key in result:
                 result[key].update(loaded[key])
@@ -75,18 +367,23 @@ class SettingsManager:
         return result
     
     def _save_settings(self, settings):
-        """Save settings to file"""
+        """Save settings to file atomically (kept pretty-printed - it is small and hand-edited)"""
         try:
-            with open(self.filename, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, indent=2, ensure_ascii=False)
+            tmp_filename = f"{self.filename}.tmp"
+            with open(tmp_filename, 'wb') as f:
+                f.write(orjson.dumps(settings, option=orjson.OPT_INDENT_2))
+            os.replace(tmp_filename, self.filename)
             logger.info("Settings saved successfully")
         except Exception as e:
             logger.error(f"Error saving settings: {e}")
     
     def get_settings(self):
-        """Get current settings (thread-safe)"""
-        with self.lock:
-            return self.settings.copy()
+        """Get current settings snapshot (thread-safe, no lock or copy)
+        
+        The returned dict is shared by all callers and must be treated as read-only.
+        update_settings() publishes a new snapshot instead of modifying this one.
+        """
+        return self._snapshot
     
     def update_settings(self, new_settings):
         """Update settings with validation (thread-safe)"""
@@ -106,6 +403,17 @@ class SettingsManager:
                 if not isinstance(val, (int, float)) or val < 1:
                     raise ValueError("request_timeout_seconds must be >= 1")
             
+            if "fetch_concurrency" in new_settings:
+                val = new_settings["fetch_concurrency"]
+                if not isinstance(val, int) or not 1 <= val <= HTTP_POOL_MAXSIZE:
+                    raise ValueError(f"fetch_concurrency must be between 1 and {HTTP_POOL_MAXSIZE}")
+            
+            openai_updates = new_settings.get("openai")
+            if isinstance(openai_updates, dict) and "concurrency" in openai_updates:
+                val = openai_updates["concurrency"]
+                if not isinstance(val, int) or not 1 <= val <= OPENAI_MAX_CONNECTIONS:
+                    raise ValueError(f"openai.concurrency must be between 1 and {OPENAI_MAX_CONNECTIONS}")
+            
             # Update and save
             for key in new_settings:
                 if isinstance(new_settings[key], dict) and key in self.settings:
@@ -113,24 +421,69 @@ class SettingsManager:
                 else:
                     self.settings[key] = new_settings[key]
             
+            # Publish the new snapshot with a single reference swap
+            self._snapshot = self._build_snapshot(self.settings)
             self._save_settings(self.settings)
-            return True
+        
+        if self.on_change:
+            self.on_change()
+        return True
 
 
 class ProductDatabase:
-    """Manages products database with file persistence"""
+    """Manages products database with file persistence
+    
+    Changes are appended to a JSON-lines change log (WAL) next to the
+    database file, so saving an item costs one line instead of a full
+    rewrite. The log is periodically compacted into the main file.
+    """
     
     def __init__(self, filename):
         self.filename = filename
+        self.wal_filename = f"{os.path.splitext(filename)[0]}.jsonl"
         self.lock = Lock()
+        # Serializes compactions; held without self.lock while the file is written
+        self._compact_lock = Lock()
         self.data = self._load_database()
+        self._replay_wal()
+        self._dirty = False
+        # Bumped on every write; lets callers cache anything derived from the items
+        self.version = 0
+        # Immutable tuple of all items shared by readers; dropped on every write, rebuilt on the next read
+        self._items_snapshot = None
+        # Same items sorted newest first, cached until the next write
+        self._newest_first_snapshot = None
+        # Sorted (discovered_at, item_id) index, kept in order on every insert
+        self._discovered_index = sorted(
+            (self._discovered_key(item), item_id) for item_id, item in self.data["items"].items()
+        )
+        # Flat CSV export row per item, built once at write time instead of on every export
+        self._export_rows = {item_id: export_row(item) for item_id, item in self.data["items"].items()}
+        self._wal_bytes = os.path.getsize(self.wal_filename) if os.path.exists(self.wal_filename) else 0
+        self._last_compact = time.monotonic()
+        self.wal = open(self.wal_filename, 'ab', buffering=1 << 20)
+        # Secondary index of item IDs still waiting for an OpenAI valuation
+        self._pending_valuation = {
+            item_id for item_id, item in self.data["items"].items()
+            if self._needs_valuation(item)
+        }
+    
+    @staticmethod
+    def _discovered_key(item):
+        """Sort key for the discovered_at index (ISO timestamps sort as strings)"""
+        return item.get('discovered_at') or ''
+    
+    @staticmethod
+    def _needs_valuation(item):
+        """Check if an item has no valuation yet or its valuation is pending"""
+        return not item.get("valuation") or item.get("valuation", {}).get("status") == "pending"
     
     def _load_database(self):
         """Load database from file or create new"""
         if os.path.exists(self.filename):
             try:
-                with open(self.filename, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                with open(self.filename, 'rb') as f:
+                    return orjson.loads(f.read())
             except Exception as e:
                 logger.error(f"Error loading database: {e}. Creating new.")
                 return self._create_new_database()
@@ -138,6 +491,31 @@ class ProductDatabase:
             logger.info("Database file not found. Creating new.")
             return self._create_new_database()
     
+    def _replay_wal(self):
+        """Apply change log entries written since the last compaction"""
+        if not os.path.exists(self.wal_filename):
+            return
+        replayed = 0
+        with open(self.wal_filename, 'rb') as f:
+            for line in f:
+                try:
+                    entry = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    # Torn final line from a crash mid-write
+                    logger.warning("Skipping unreadable change log entry")
+                    continue
+                if "fields" in entry:
+                    # Partial update logged by update_fields()
+                    item = self.data["items"].get(entry["id"])
+                    if item is None:
+                        continue
+                    self.data["items"][entry["id"]] = {**item, **entry["fields"]}
+                else:
+                    self.data["items"][entry["id"]] = entry["item"]
+                replayed += 1
+        if replayed:
+            logger.info(f"Replayed {replayed} change log entries")
+    
     def _create_new_database(self):
         """Create new database structure"""
         return {
@@ -150,55 +528,236 @@ class ProductDatabase:
         }
     
     def _save_database(self):
-        """Save database to file"""
-        try:
-            self.data["meta"]["updated_at"] = datetime.now().isoformat()
-            with open(self.filename, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Error saving database: {e}")
+        """Save database to file atomically and drop the compacted part of the change log
+        
+        Only the snapshot is taken under the lock; serializing and writing the
+        file happen outside it, so readers and add_item() are not stalled.
+        """
+        with self._compact_lock:
+            with self.lock:
+                self.wal.flush()
+                self._dirty = False
+                wal_offset = self.wal.tell()
+                self.data["meta"]["updated_at"] = datetime.now().isoformat()
+                snapshot = dict(self.data)
+                snapshot["meta"] = dict(self.data["meta"])
+                snapshot["items"] = dict(self.data["items"])
+            
+            try:
+                tmp_filename = f"{self.filename}.tmp"
+                with open(tmp_filename, 'wb') as f:
+                    # Compact output - this file is rewritten on every compaction and only read by the bot
+                    f.write(orjson.dumps(snapshot, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_filename, self.filename)
+            except Exception as e:
+                logger.error(f"Error saving database: {e}")
+                return
+            
+            with self.lock:
+                # Keep only entries logged while the snapshot was being written
+                # (a crash in between just replays entries already in the file, which is harmless)
+                self.wal.flush()
+                with open(self.wal_filename, 'rb') as f:
+                    f.seek(wal_offset)
+                    tail = f.read()
+                self.wal.seek(0)
+                self.wal.truncate()
+                if tail:
+                    self.wal.write(tail)
+                    self.wal.flush()
+                self._wal_bytes = len(tail)
+                self._last_compact = time.monotonic()
+    
+    def flush(self):
+        """Write pending changes to the change log, compacting it when it is large or old"""
+        with self.lock:
+            if self._dirty:
+                try:
+                    self.wal.flush()
+                    self._dirty = False
+                except Exception as e:
+                    logger.error(f"Error writing change log: {e}")
+            compact = self._wal_bytes and (
+                self._wal_bytes >= DB_COMPACT_WAL_BYTES
+                or time.monotonic() - self._last_compact >= DB_COMPACT_INTERVAL_SECONDS
+            )
+        if compact:
+            self._save_database()
+    
+    def close(self):
+        """Compact any logged changes into the main file and close the change log"""
+        if self._wal_bytes:
+            self._save_database()
+        with self.lock:
+            self.wal.close()
     
     def item_exists(self, item_id):
         """Check if item exists"""
-        with self.lock:
-            return str(item_id) in self.data["items"]
+        # A single dict membership test is atomic under the GIL and items are
+        # never removed, so no lock is needed
+        return str(item_id) in self.data["items"]
+    
+    def filter_new(self, item_ids):
+        """Return the IDs (in order) that are not stored yet"""
+        # Lock-free for the same reason as item_exists()
+        items = self.data["items"]
+        return [item_id for item_id in item_ids if item_id not in items]
     
     def add_item(self, item_id, item_data):
-        """Add or update item"""
+        """Add or update item (written to disk on the next flush)"""
+        item_id = str(item_id)
+        row = export_row(item_data)
         with self.lock:
-            self.data["items"][str(item_id)] = item_data
-            self._save_database()
+            entry = orjson.dumps({"id": item_id, "item": item_data}, option=orjson.OPT_NON_STR_KEYS) + b"\n"
+            self._store_item(item_id, item_data, row, entry)
+    
+    def update_fields(self, item_id, fields):
+        """Update some fields of a stored item; only the changed fields go to the change log
+        
+        Returns:
+            bool: False if the item does not exist
+        """
+        item_id = str(item_id)
+        with self.lock:
+            previous = self.data["items"].get(item_id)
+            if previous is None:
+                return False
+            # A new dict, not an in-place update - published snapshots keep referencing the old one
+            item_data = {**previous, **fields}
+            entry = orjson.dumps({"id": item_id, "fields": fields}, option=orjson.OPT_NON_STR_KEYS) + b"\n"
+            self._store_item(item_id, item_data, export_row(item_data), entry)
+        return True
+    
+    def _store_item(self, item_id, item_data, row, entry):
+        """Store an item, update every index and log the change (caller holds self.lock)"""
+        # Checked before any in-memory change, so a refused write leaves no unsaved item behind
+        if self.wal.closed:
+            raise ValueError("Database is closed")
+        previous = self.data["items"].get(item_id)
+        key = self._discovered_key(item_data)
+        if previous is None:
+            insort(self._discovered_index, (key, item_id))
+        else:
+            previous_key = self._discovered_key(previous)
+            if previous_key != key:
+                index = self._discovered_index
+                del index[bisect_left(index, (previous_key, item_id))]
+                insort(index, (key, item_id))
+        self.data["items"][item_id] = item_data
+        self._export_rows[item_id] = row
+        self._items_snapshot = None
+        self._newest_first_snapshot = None
+        self.version += 1
+        if self._needs_valuation(item_data):
+            self._pending_valuation.add(item_id)
+        else:
+            self._pending_valuation.discard(item_id)
+        self.wal.write(entry)
+        self._wal_bytes += len(entry)
+        self._dirty = True
     
     def get_item(self, item_id):
         """Get single item"""
         with self.lock:
             return self.data["items"].get(str(item_id))
     
+    def _items_view(self):
+        """Get the shared snapshot tuple of all items, rebuilding it only after a write"""
+        snapshot = self._items_snapshot
+        if snapshot is None:
+            with self.lock:
+                snapshot = self._items_snapshot
+                if snapshot is None:
+                    snapshot = self._items_snapshot = tuple(self.data["items"].values())
+        return snapshot
+    
     def get_all_items(self):
-        """Get all items as list"""
+        """Get all items as list (copied from the snapshot outside the lock)"""
+        return list(self._items_view())
+    
+    def count_items(self):
+        """Get the number of stored items"""
+        return len(self.data["items"])
+    
+    def max_discovered_at(self):
+        """Get the newest discovered_at timestamp (None if no item has one) from the sorted index"""
+        with self.lock:
+            if self._discovered_index:
+                return self._discovered_index[-1][0] or None
+            return None
+    
+    def iter_export_rows(self):
+        """Iterate the precomputed CSV export rows (only the tuple of row references is copied)"""
         with self.lock:
-            return list(self.data["items"].values())
+            return iter(tuple(self._export_rows.values()))
+    
+    def get_all_items_newest_first(self):
+        """Get all items sorted by discovered_at descending, as a shared read-only tuple
+        
+        Read straight off the sorted discovered_at index - no sort at request
+        time - and cached until the next write.
+        """
+        snapshot = self._newest_first_snapshot
+        if snapshot is None:
+            with self.lock:
+                snapshot = self._newest_first_snapshot
+                if snapshot is None:
+                    items = self.data["items"]
+                    snapshot = self._newest_first_snapshot = tuple(
+                        items[item_id] for _, item_id in reversed(self._discovered_index)
+                    )
+        return snapshot
     
     def get_items_needing_valuation(self):
         """Get items that need OpenAI valuation"""
         with self.lock:
-            items = []
-            for item_id, item in self.data["items"].items():
-                if not item.get("valuation") or item.get("valuation", {}).get("status") == "pending":
-                    items.append((item_id, item))
-            return items
+            items = self.data["items"]
+            return [(item_id, items[item_id]) for item_id in self._pending_valuation]
 
 
 class ToriFetcher:
     """Handles HTTP requests with retries, jitter, and error handling"""
     
-    def __init__(self, settings_manager):
+    def __init__(self, settings_manager, stop_event=None):
         self.settings_manager = settings_manager
+        # One shared pacing limiter instead of a 0-3 s sleep in front of every request
+        self.rate_limiter = RateLimiter(FETCH_MIN_INTERVAL_SECONDS, FETCH_JITTER_SECONDS)
+        self.stop_event = stop_event
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         })
+        # Every compression urllib3 can decode here (adds br/zstd when those packages are installed)
+        self.session.headers.update(make_headers(accept_encoding=True))
+        
+        self._adapter_lock = Lock()
+        self._mounted_retries = None
+        self._mount_adapter(settings_manager.get_settings().get("max_retries", 2))
         self.logged_in = False
+        # Listing URL -> conditional request headers (If-None-Match/If-Modified-Since) from its last response
+        self._listing_validators = {}
+    
+    def _mount_adapter(self, max_retries):
+        """Mount a pooled HTTP adapter whose urllib3 Retry policy handles transient failures"""
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=1,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        # Size the connection pool for parallel item/image fetches so sockets are reused, not discarded
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_CONNECTIONS,
+            pool_maxsize=HTTP_POOL_MAXSIZE,
+            max_retries=retry
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._mounted_retries = max_retries
     
     def login_if_configured(self):
         """Attempt login if credentials are configured"""
@@ -217,7 +776,7 @@ class ToriFetcher:
             
         try:
             # First get login page for any tokens/csrf (unused variable fixed)
-            self.session.get("https://www.tori.fi/")
+            self.session.get("https://www.tori.fi/", timeout=15)
             
             # Attempt login (this is a simplified version - actual implementation would need proper form handling)
             login_data = {
@@ -244,31 +803,35 @@ class ToriFetcher:
             return False
     
     def _add_jitter(self):
-        """Add random jitter 0-3 seconds"""
-        time.sleep(random.uniform(0, 3))
+        """Wait for this request's jittered slot; returns False if the bot is stopping"""
+        return self.rate_limiter.wait(self.stop_event)
     
-    def _fetch_with_retries(self, url, timeout):
-        """Fetch URL with retry logic and exponential backoff"""
-        settings = self.settings_manager.get_settings()
-        max_retries = settings.get("max_retries", 2)
-        
-        for attempt in range(max_retries + 1):
-            try:
-                response = self.session.get(url, timeout=timeout)
-                response.raise_for_status()
-                return response
-            except Exception as e:
-                if attempt < max_retries:
-                    wait_time = (2 ** attempt) * 1  # Exponential backoff
-                    logger.warning(f"Fetch attempt {attempt + 1} failed for {url}: {e}. Retrying in {wait_time}s...")
-                    time.sleep(wait_time)
-                else:
-                    logger.error(f"All fetch attempts failed for {url}: {e}")
-                    return None
+    def _fetch_with_retries(self, url, timeout, max_retries, stream=False, headers=None):
+        """Fetch URL; retries with exponential backoff are done by the adapter's urllib3 Retry"""
+        if max_retries != self._mounted_retries:
+            # max_retries setting changed - remount so the adapter picks it up
+            with self._adapter_lock:
+                if max_retries != self._mounted_retries:
+                    self._mount_adapter(max_retries)
+        try:
+            response = self.session.get(url, timeout=timeout, stream=stream, headers=headers)
+            response.raise_for_status()
+            return response
+        except Exception as e:
+            logger.error(f"All fetch attempts failed for {url}: {e}")
+            return None
     
-    def fetch_listing_page(self, page=None):
-        """Fetch main listing page"""
-        settings = self.settings_manager.get_settings()
+    def fetch_listing_page(self, page=None, settings=None):
+        """Fetch main listing page as raw bytes (ID extraction needs no text decoding)
+        
+        The request is conditional on the page's last ETag/Last-Modified, so an
+        unchanged listing costs a bodiless 304.
+        
+        Returns:
+            bytes: Page body, LISTING_UNCHANGED if unchanged since the last fetch, or None on failure
+        """
+        if settings is None:
+            settings = self.settings_manager.get_settings()
         url = settings.get("listing_url")
         
         # Add page parameter if specified
@@ -279,39 +842,111 @@ class ToriFetcher:
                 url = f"{url}?page={page}"
         
         timeout = settings.get("request_timeout_seconds", 15)
+        max_retries = settings.get("max_retries", 2)
         
-        self._add_jitter()
-        response = self._fetch_with_retries(url, timeout)
+        if not self._add_jitter():
+            return None
+        response = self._fetch_with_retries(url, timeout, max_retries, headers=self._listing_validators.get(url))
         
-        if response:
-            return response.text
-        return None
+        if response is None:
+            return None
+        if response.status_code == 304:
+            return LISTING_UNCHANGED
+        
+        validators = {}
+        if response.headers.get('ETag'):
+            validators['If-None-Match'] = response.headers['ETag']
+        if response.headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = response.headers['Last-Modified']
+        self._listing_validators[url] = validators
+        return response.content
+    
+    def forget_listing_validators(self):
+        """Make the next listing fetches unconditional (e.g. to retry items that failed)"""
+        self._listing_validators.clear()
     
-    def fetch_item_page(self, item_id):
+    def fetch_item_page(self, item_id, settings=None):
         """Fetch individual item page"""
-        settings = self.settings_manager.get_settings()
+        if settings is None:
+            settings = self.settings_manager.get_settings()
         url = f"https://www.tori.fi/recommerce/forsale/item/{item_id}"
         timeout = settings.get("request_timeout_seconds", 15)
+        max_retries = settings.get("max_retries", 2)
         
-        self._add_jitter()
-        response = self._fetch_with_retries(url, timeout)
+        if not self._add_jitter():
+            return None
+        response = self._fetch_with_retries(url, timeout, max_retries, stream=True)
         
         if response:
-            return response.text
+            # Read at most ITEM_PAGE_MAX_BYTES, then hand the connection back to the pool
+            with response:
+                chunks = []
+                size = 0
+                for chunk in response.iter_content(chunk_size=IMAGE_DOWNLOAD_CHUNK_SIZE):
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= ITEM_PAGE_MAX_BYTES:
+                        break
+            # Tori pages are UTF-8; decoding directly skips requests' charset detection
+            # (errors='replace' guards a multi-byte character cut at the size cap)
+            return b''.join(chunks)[:ITEM_PAGE_MAX_BYTES].decode('utf-8', errors='replace')
         return None
     
-    def download_image(self, url, save_path):
+    @staticmethod
+    def _has_image_signature(data):
+        """Check magic bytes for the image formats Tori serves (JPEG, PNG, GIF, WebP)"""
+        return (
+            data.startswith(IMAGE_SIGNATURES)
+            or (data[:4] == b'RIFF' and data[8:12] == b'WEBP')
+        )
+    
+    def download_image(self, url, save_path, settings=None):
         """Download and save image"""
+        # Queued downloads are skipped once the bot is stopping
+        if self.stop_event.is_set():
+            return False
         try:
-            settings = self.settings_manager.get_settings()
+            if settings is None:
+                settings = self.settings_manager.get_settings()
             timeout = settings.get("request_timeout_seconds", 15)
+            max_retries = settings.get("max_retries", 2)
             
-            response = self._fetch_with_retries(url, timeout)
+            response = self._fetch_with_retries(url, timeout, max_retries, stream=True)
             if not response:
                 return False
             
-            # Validate it's an image
-            img = Image.open(BytesIO(response.content))
+            with response:
+                chunks = response.iter_content(chunk_size=IMAGE_DOWNLOAD_CHUNK_SIZE)
+                # Read just enough to check the magic bytes
+                head = b''
+                for chunk in chunks:
+                    head += chunk
+                    if len(head) >= IMAGE_SIGNATURE_LENGTH:
+                        break
+                
+                if self._has_image_signature(head):
+                    # Already a valid image file - stream the bytes to disk as-is, no decode/re-encode
+                    tmp_path = f"{save_path}.part"
+                    try:
+                        with open(tmp_path, 'wb') as f:
+                            f.write(head)
+                            for chunk in chunks:
+                                f.write(chunk)
+                        os.replace(tmp_path, save_path)
+                    except BaseException:
+                        if os.path.exists(tmp_path):
+                            os.remove(tmp_path)
+                        raise
+                    return True
+                
+                # Unknown format: validate and convert via Pillow (needs the whole body)
+                buffer = BytesIO(head)
+                buffer.seek(0, os.SEEK_END)
+                for chunk in chunks:
+                    buffer.write(chunk)
+                buffer.seek(0)
+            
+            img = Image.open(buffer)
             img.save(save_path)
             return True
         except Exception as e:
@@ -324,71 +959,82 @@ class ProductExtractor:
     
     @staticmethod
     def extract_product_ids(html):
-        """Extract product IDs from listing page"""
+        """Extract unique product IDs from listing page (str or bytes), in page order (newest first)"""
         if not html:
             return []
-        matches = re.findall(PRODUCT_ID_PATTERN, html)
-        return list(set(matches))  # Unique IDs
+        # Only the item hrefs are needed, so one regex pass over the raw bytes beats building a DOM;
+        # dict.fromkeys deduplicates in one pass and, unlike a set, keeps the page order
+        if isinstance(html, bytes):
+            return [item_id.decode('ascii') for item_id in dict.fromkeys(PRODUCT_ID_BYTES_RE.findall(html))]
+        return list(dict.fromkeys(PRODUCT_ID_RE.findall(html)))
     
     @staticmethod
     def extract_product_details(html, item_id):
         """Extract details from item page"""
         errors = []
+        # One timestamp for both discovered_at and updated_at (ISO strings sort chronologically)
+        now = datetime.now().isoformat()
         
         try:
+            # Parse the page once when selectolax is available; DOM lookups then replace full-page regex scans
+            tree = HTMLParser(html) if HTMLParser is not None else None
+            
+            # Structured data first - one JSON-LD parse covers most fields; regexes are the fallback
+            ld = ProductExtractor._extract_json_ld_fields(html, tree)
+            
             # Title
-            title = None
-            match = re.search(r'<h1[^>]*>(.*?)</h1>', html, re.DOTALL)
-            if match:
-                title = ProductExtractor._clean_text(match.group(1))
-            else:
+            title = ld.get("title")
+            if not title:
+                if tree is not None:
+                    node = tree.css_first('h1')
+                    if node:
+                        title = ProductExtractor._clean_text(node.text())
+                else:
+                    match = TITLE_RE.search(html)
+                    if match:
+                        title = ProductExtractor._clean_text(match.group(1))
+            if not title:
                 errors.append("Failed to extract title")
             
             # Description
-            description = None
-            patterns = [
-                r'<meta\s+property="og:description"\s+content="([^"]*)"',
-                r'<meta\s+name="description"\s+content="([^"]*)"',
-            ]
-            for pattern in patterns:
-                match = re.search(pattern, html, re.IGNORECASE)
-                if match:
-                    description = ProductExtractor._clean_text(match.group(1))
-                    break
+            description = ld.get("description")
+            if not description:
+                if tree is not None:
+                    for selector in DESCRIPTION_SELECTORS:
+                        node = tree.css_first(selector)
+                        content = node.attributes.get('content') if node else None
+                        if content:
+                            description = ProductExtractor._clean_text(content)
+                            break
+                else:
+                    for pattern in DESCRIPTION_RES:
+                        match = pattern.search(html)
+                        if match:
+                            description = ProductExtractor._clean_text(match.group(1))
+                            break
             if not description:
                 errors.append("Failed to extract description")
             
             # Location - improved extraction with multiple patterns
-            location = None
-            location_patterns = [
-                r'"location"\s*:\s*"([^"]+)"',
-                r'<span[^>]*location[^>]*>([^<]+)</span>',
-                r'class="[^"]*location[^"]*"[^>]*>([^<]+)<',
-                r'"address"[^}]*"locality"\s*:\s*"([^"]+)"'
-            ]
-            for pattern in location_patterns:
-                match = re.search(pattern, html, re.IGNORECASE)
-                if match:
-                    location = ProductExtractor._clean_text(match.group(1))
-                    break
+            location = ld.get("location")
+            if not location:
+                for pattern in LOCATION_RES:
+                    match = pattern.search(html)
+                    if match:
+                        location = ProductExtractor._clean_text(match.group(1))
+                        break
             if not location:
                 errors.append("Failed to extract location")
             
             # Seller - improved extraction with multiple patterns
             # NOTE: In ostobotti context, this refers to the buyer/requester who posted the "wanted" listing
-            seller = None
-            seller_patterns = [
-                r'"seller"[^}]*"name"\s*:\s*"([^"]+)"',
-                r'"sellerName"\s*:\s*"([^"]+)"',
-                r'<span[^>]*seller[^>]*>([^<]+)</span>',
-                r'class="[^"]*seller[^"]*"[^>]*>([^<]+)<',
-                r'"advertiser"[^}]*"name"\s*:\s*"([^"]+)"'
-            ]
-            for pattern in seller_patterns:
-                match = re.search(pattern, html, re.IGNORECASE)
-                if match:
-                    seller = ProductExtractor._clean_text(match.group(1))
-                    break
+            seller = ld.get("seller")
+            if not seller:
+                for pattern in SELLER_RES:
+                    match = pattern.search(html)
+                    if match:
+                        seller = ProductExtractor._clean_text(match.group(1))
+                        break
             if not seller:
                 # Try to extract from different parts of the page if logged in
                 if "logged" in html.lower() or "profile" in html.lower():
@@ -396,24 +1042,15 @@ class ProductExtractor:
                 else:
                     errors.append("Seller info not available (login required)")
             
-            # Images - improved extraction with multiple patterns
+            # Images - unique URLs in page order, stopping as soon as there are enough
             images = []
-            image_patterns = [
-                r'"image"\s*:\s*"(https://[^"]+)"',
-                r'"imageUrl"\s*:\s*"(https://[^"]+)"',
-                r'src="(https://[^"]*tori[^"]*\.(jpg|jpeg|png|webp)[^"]*)"|src="(https://[^"]*image[^"]*\.(jpg|jpeg|png|webp)[^"]*)"'
-            ]
-            
-            for pattern in image_patterns:
-                img_matches = re.findall(pattern, html, re.IGNORECASE)
-                for match_groups in img_matches:
-                    # Handle different regex group structures
-                    img_url = match_groups[0] if isinstance(match_groups, tuple) else match_groups
-                    if img_url and img_url.startswith('https://'):
-                        images.append(img_url)
-            
-            # Remove duplicates and limit to 5
-            images = list(set(images))[:5]
+            seen = set()
+            for img_url in ProductExtractor._image_candidates(html, tree, ld.get("images")):
+                if img_url not in seen:
+                    seen.add(img_url)
+                    images.append(img_url)
+                    if len(images) >= MAX_ITEM_IMAGES:
+                        break
             
             if not images:
                 errors.append("No images found")
@@ -427,8 +1064,8 @@ class ProductExtractor:
                 "seller": seller,
                 "images": images,
                 "image_files": [],
-                "discovered_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat(),
+                "discovered_at": now,
+                "updated_at": now,
                 "errors": errors if errors else None,
                 "valuation": None
             }
@@ -443,21 +1080,110 @@ class ProductExtractor:
                 "seller": None,
                 "images": [],
                 "image_files": [],
-                "discovered_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat(),
+                "discovered_at": now,
+                "updated_at": now,
                 "errors": [f"Exception during extraction: {str(e)}"],
                 "valuation": None
             }
     
+    @staticmethod
+    def _json_ld_blocks(html, tree=None):
+        """Yield the raw text of each JSON-LD script block (from the parsed tree if there is one)"""
+        if tree is not None:
+            for node in tree.css(LDJSON_SELECTOR):
+                yield node.text()
+        else:
+            for match in LDJSON_RE.finditer(html):
+                yield match.group(1)
+    
+    @staticmethod
+    def _extract_json_ld_fields(html, tree=None):
+        """Extract item fields from the page's schema.org JSON-LD Product block
+        
+        Returns:
+            dict: Any of title, description, location, seller, images that were found
+        """
+        product = None
+        for block in ProductExtractor._json_ld_blocks(html, tree):
+            try:
+                data = orjson.loads(block)
+            except orjson.JSONDecodeError:
+                continue
+            candidates = data.get("@graph", [data]) if isinstance(data, dict) else data
+            for candidate in candidates if isinstance(candidates, list) else []:
+                if isinstance(candidate, dict) and candidate.get("@type") == "Product":
+                    product = candidate
+                    break
+            if product:
+                break
+        
+        if not product:
+            return {}
+        
+        def clean(value):
+            return ProductExtractor._clean_text(value) if isinstance(value, str) else None
+        
+        fields = {}
+        fields["title"] = clean(product.get("name"))
+        fields["description"] = clean(product.get("description"))
+        
+        offers = product.get("offers") or {}
+        if isinstance(offers, list):
+            offers = offers[0] if offers else {}
+        if not isinstance(offers, dict):
+            offers = {}
+        seller = offers.get("seller") or {}
+        if isinstance(seller, dict):
+            fields["seller"] = clean(seller.get("name"))
+        place = offers.get("availableAtOrFrom") or {}
+        address = place.get("address") if isinstance(place, dict) else None
+        if isinstance(address, dict):
+            fields["location"] = clean(address.get("addressLocality"))
+        
+        images = product.get("image") or []
+        if not isinstance(images, list):
+            images = [images]
+        fields["images"] = [
+            url for url in (img.get("url") or img.get("contentUrl") if isinstance(img, dict) else img for img in images)
+            if isinstance(url, str) and url.startswith('https://')
+        ]
+        return fields
+    
+    @staticmethod
+    def _image_candidates(html, tree, ld_images):
+        """Yield image URLs lazily: JSON-LD images if any, else og:image tags, image fields in inline JSON, then <img src> URLs"""
+        if ld_images:
+            yield from ld_images
+            return
+        if tree is not None:
+            for node in tree.css(OG_IMAGE_SELECTOR):
+                content = node.attributes.get('content')
+                if content and content.startswith('https://'):
+                    yield content
+        else:
+            for match in OG_IMAGE_RE.finditer(html):
+                yield match.group(1)
+        for pattern in IMAGE_RES:
+            for match in pattern.finditer(html):
+                yield match.group(1)
+        for match in IMAGE_SRC_RE.finditer(html):
+            url = match.group(1)
+            lowered = url.lower()
+            if 'tori' in lowered or 'image' in lowered:
+                yield url
+    
     @staticmethod
     def _clean_text(text):
         """Clean extracted text"""
         if not text:
             return None
-        text = re.sub(r'<[^>]+>', '', text)
-        text = unescape(text)
-        text = ' '.join(text.split())
-        return text.strip() or None
+        # Most fields are already plain text - only pay for tag stripping / unescaping when needed
+        if '<' in text:
+            text = TAG_RE.sub('', text)
+        if '&' in text:
+            text = unescape(text)
+        # split()/join() collapses whitespace and strips the ends in one C-level pass
+        return ' '.join(text.split()) or None
 
 
 class OpenAIValuator:
@@ -466,41 +1192,124 @@ class OpenAIValuator:
     def __init__(self, settings_manager, valuation_prompt_builder):
         self.settings_manager = settings_manager
         self.valuation_prompt_builder = valuation_prompt_builder
+        # Reused across valuations so the HTTP connection pool stays warm
+        self._client = None
+        self._client_key = None
+        self._client_lock = Lock()
+        # Completed valuations keyed by a hash of (model, prompt) - reposts of the same listing reuse them.
+        # LRU order (most recently used last), capped at VALUATION_CACHE_MAX_ENTRIES
+        self._valuation_cache = OrderedDict()
+        self._valuation_cache_lock = Lock()
+    
+    def _cache_key(self, model, system_message, user_prompt):
+        """Stable key for a valuation request - identical prompts to the same model get the same answer"""
+        return hashlib.blake2b(f"{model}\0{system_message}\0{user_prompt}".encode('utf-8'), digest_size=16).digest()
+    
+    def remember_valuations(self, items):
+        """Seed the valuation cache from stored items that already have a completed valuation"""
+        entries = {}
+        for item in items:
+            valuation = item.get("valuation")
+            if valuation and valuation.get("status") == "completed" and valuation.get("model"):
+                system_message, user_prompt = self.valuation_prompt_builder(item)
+                entries[self._cache_key(valuation["model"], system_message, user_prompt)] = valuation
+        with self._valuation_cache_lock:
+            for cache_key, valuation in entries.items():
+                self._cache_valuation(cache_key, valuation)
+        return min(len(entries), VALUATION_CACHE_MAX_ENTRIES)
     
-    def is_enabled(self):
+    def _cache_valuation(self, cache_key, valuation):
+        """Store a valuation as most recently used, dropping the oldest past the cap (caller holds the lock)"""
+        cache = self._valuation_cache
+        cache[cache_key] = valuation
+        cache.move_to_end(cache_key)
+        if len(cache) > VALUATION_CACHE_MAX_ENTRIES:
+            cache.popitem(last=False)
+    
+    def _cached_valuation(self, cache_key):
+        """Get a cached valuation (marking it most recently used), or None"""
+        with self._valuation_cache_lock:
+            valuation = self._valuation_cache.get(cache_key)
+            if valuation is not None:
+                self._valuation_cache.move_to_end(cache_key)
+            return valuation
+    
+    def is_enabled(self, settings=None):
         """Check if OpenAI is enabled"""
-        settings = self.settings_manager.get_settings()
+        if settings is None:
+            settings = self.settings_manager.get_settings()
         openai_settings = settings.get("openai", {})
         return openai_settings.get("enabled", False) and openai_settings.get("api_key", "").strip() != ""
     
-    def valuate_item(self, item):
+    def _get_client(self, openai_settings):
+        """Get the cached OpenAI client, building a new one only when api_key/base_url change"""
+        client_key = (
+            openai_settings.get("api_key"),
+            openai_settings.get("base_url", "https://api.openai.com/v1")
+        )
+        with self._client_lock:
+            if self._client is None or client_key != self._client_key:
+                if self._client is not None:
+                    try:
+                        self._client.close()
+                    except Exception as e:
+                        logger.warning(f"Error closing previous OpenAI client: {e}")
+                http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+                        max_connections=OPENAI_MAX_CONNECTIONS
+                    ),
+                    timeout=OPENAI_TIMEOUT_SECONDS
+                )
+                self._client = OpenAI(api_key=client_key[0], base_url=client_key[1], http_client=http_client)
+                self._client_key = client_key
+            return self._client
+    
+    @staticmethod
+    def _extract_prices(valuation_text):
+        """Get (price_new, price_current) from the HINTA_UUTENA/ARVO_NYT lines in one regex pass
+        
+        The old "ARVO:" format is a fallback for price_current; the first value of each label wins.
+        """
+        found = {}
+        for match in PRICE_RE.finditer(valuation_text):
+            found.setdefault(match.group(1).upper(), int(match.group(2)))
+        price_current = found.get("ARVO_NYT")
+        if price_current is None:
+            price_current = found.get("ARVO")
+        return found.get("HINTA_UUTENA"), price_current
+    
+    def valuate_item(self, item, settings=None):
         """Valuate a single item using OpenAI"""
-        if not self.is_enabled():
+        if settings is None:
+            settings = self.settings_manager.get_settings()
+        if not self.is_enabled(settings):
             return None
         
         try:
-            settings = self.settings_manager.get_settings()
             openai_settings = settings.get("openai", {})
             
-            # Import OpenAI
-            try:
-                from openai import OpenAI
-            except ImportError:
+            # Get prompt from configuration
+            system_message, user_prompt = self.valuation_prompt_builder(item)
+            model = openai_settings.get("model", "gpt-4o-mini")
+            
+            # Same prompt already valuated (e.g. a reposted listing) - reuse it; needs no client at all
+            cache_key = self._cache_key(model, system_message, user_prompt)
+            cached = self._cached_valuation(cache_key)
+            if cached is not None:
+                logger.info(f"Reusing cached valuation for item {item.get('id')}")
+                return {**cached, "timestamp": datetime.now().isoformat()}
+            
+            if OpenAI is None:
                 logger.error("OpenAI package not installed")
                 return {"status": "error", "message": "OpenAI package not installed"}
             
-            # Create client
-            client = OpenAI(
-                api_key=openai_settings.get("api_key"),
-                base_url=openai_settings.get("base_url", "https://api.openai.com/v1")
-            )
-            
-            # Get prompt from configuration
-            system_message, user_prompt = self.valuation_prompt_builder(item)
+            # Get (cached) client
+            client = self._get_client(openai_settings)
             
             # Call API
             response = client.chat.completions.create(
-                model=openai_settings.get("model", "gpt-4o-mini"),
+                model=model,
                 messages=[
                     {"role": "system", "content": system_message},
                     {"role": "user", "content": user_prompt}
@@ -512,43 +1321,20 @@ class OpenAIValuator:
             valuation_text = response.choices[0].message.content.strip()
             
             # Extract both price values
-            price_new = None
-            price_current = None
-            
-            # Try to extract "HINTA_UUTENA" value
-            price_new_match = re.search(r'HINTA_UUTENA:\s*(\d+)€?', valuation_text, re.IGNORECASE)
-            if price_new_match:
-                try:
-                    price_new = int(price_new_match.group(1))
-                except ValueError:
-                    pass
-            
-            # Try to extract "ARVO_NYT" value
-            price_current_match = re.search(r'ARVO_NYT:\s*(\d+)€?', valuation_text, re.IGNORECASE)
-            if price_current_match:
-                try:
-                    price_current = int(price_current_match.group(1))
-                except ValueError:
-                    pass
-            
-            # Fallback to old "ARVO:" format for backwards compatibility
-            if price_current is None:
-                price_match = re.search(r'ARVO:\s*(\d+)€?', valuation_text, re.IGNORECASE)
-                if price_match:
-                    try:
-                        price_current = int(price_match.group(1))
-                    except ValueError:
-                        pass
+            price_new, price_current = self._extract_prices(valuation_text)
             
-            return {
+            valuation = {
                 "status": "completed",
                 "text": valuation_text,
                 "price_new": price_new,
                 "price_current": price_current,
                 "price_estimate": price_current,  # Keep for backwards compatibility
-                "model": openai_settings.get("model"),
+                "model": model,
                 "timestamp": datetime.now().isoformat()
             }
+            with self._valuation_cache_lock:
+                self._cache_valuation(cache_key, valuation)
+            return valuation
         
         except Exception as e:
             logger.error(f"Error valuating item {item.get('id')}: {e}")
@@ -559,6 +1345,30 @@ class OpenAIValuator:
             }
 
 
+class RateLimiter:
+    """Spaces out calls from any number of threads to at most one per interval (plus optional random jitter)"""
+    
+    def __init__(self, interval, jitter=0):
+        self.interval = interval
+        self.jitter = jitter
+        self._lock = Lock()
+        self._next_slot = time.monotonic()
+    
+    def wait(self, stop_event=None):
+        """Block until this caller's slot; returns False if stop_event was set while waiting"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval + (random.uniform(0, self.jitter) if self.jitter else 0)
+        delay = slot - now
+        if delay <= 0:
+            return True
+        if stop_event is not None:
+            return not stop_event.wait(delay)
+        time.sleep(delay)
+        return True
+
+
 class ToriBot:
     """Main bot coordinator"""
     
@@ -577,21 +1387,35 @@ class ToriBot:
                     that builds OpenAI prompts for the specific bot type
         """
         self.config = config
+        
+        # Set to cut the scheduler's wait short, e.g. when settings change an interval
+        self.wake_event = Event()
+        
         self.settings_manager = SettingsManager(
             config['settings_file'],
-            config['default_settings']
+            config['default_settings'],
+            on_change=self._on_settings_changed
         )
         self.database = ProductDatabase(config['products_file'])
-        self.fetcher = ToriFetcher(self.settings_manager)
+        self.stop_event = Event()
+        self.fetcher = ToriFetcher(self.settings_manager, self.stop_event)
         self.valuator = OpenAIValuator(
             self.settings_manager,
             config['valuation_prompt_builder']
         )
         
         self.running = False
-        self.stop_event = Event()
-        self.poll_thread = None
-        self.valuation_thread = None
+        # stop() closes the database and the worker pools for good - a stopped bot cannot be started again
+        self.stopped = False
+        self.scheduler_thread = None
+        # Reused for every background job instead of spawning a thread per request
+        self.background = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix='bg')
+        # Database flushes get a thread of their own, so they never queue behind slow background jobs
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+        self.flush_future = None
+        self.valuation_future = None
+        self._valuation_cache_seeded = False
+        self._valuation_lock = Lock()
         self.last_valuation_time = None
         
         # Ensure directories exist
@@ -603,21 +1427,20 @@ class ToriBot:
             logger.info("Tori.fi login successful - enhanced data extraction available")
     
     def start(self):
-        """Start the bot"""
+        """Start the bot (once - create a new ToriBot to run again after stop())"""
         if self.running:
             logger.warning("Bot already running")
             return
+        if self.stopped:
+            logger.warning("Bot has been stopped and cannot be restarted")
+            return
         
         self.running = True
         self.stop_event.clear()
         
-        # Start polling thread
-        self.poll_thread = Thread(target=self._poll_loop, daemon=True)
-        self.poll_thread.start()
-        
-        # Start valuation thread
-        self.valuation_thread = Thread(target=self._valuation_loop, daemon=True)
-        self.valuation_thread.start()
+        # One scheduler thread drives polling, valuations and database flushes
+        self.scheduler_thread = Thread(target=self._scheduler_loop, daemon=True)
+        self.scheduler_thread.start()
         
         logger.info("Bot started")
     
@@ -627,118 +1450,252 @@ class ToriBot:
             return
         
         self.running = False
+        self.stopped = True
         self.stop_event.set()
+        self.wake_event.set()
         
         logger.info("Bot stopping...")
         
-        if self.poll_thread:
-            self.poll_thread.join(timeout=5)
-        if self.valuation_thread:
-            self.valuation_thread.join(timeout=5)
+        # No timeout: the scheduler runs polls inline and they write to the database, so it must be
+        # done before the change log closes. Polls check stop_event before every fetch and write,
+        # so this only waits for requests already in flight
+        if self.scheduler_thread:
+            self.scheduler_thread.join()
+        # Let running jobs (valuations, refreshes, multi-page fetches) finish their current step -
+        # they all check stop_event, so queued work returns at once - before the change log closes
+        self.background.shutdown(wait=True)
+        self.writer.shutdown(wait=True)
+        
+        # Persist anything still pending
+        self.database.close()
         
         logger.info("Bot stopped")
     
-    def _poll_loop(self):
-        """Polling loop - runs continuously"""
-        logger.info("Polling loop started")
+    def _scheduler_loop(self):
+        """Scheduler loop - runs polls inline and starts valuation runs and flushes when due
+        
+        Deadlines are counted on the monotonic clock from the start of the previous
+        cycle (so a slow cycle does not push the next one back) and are recomputed
+        from the current settings on every wake-up, so changed intervals apply at once.
+        """
+        logger.info("Scheduler started")
+        
+        last_poll = last_valuation = None
+        next_flush = time.monotonic() + DB_FLUSH_INTERVAL_SECONDS
         
         while self.running and not self.stop_event.is_set():
-            try:
-                self._poll_once()
-            except Exception as e:
-                logger.error(f"Error in poll loop: {e}")
+            # Cleared before settings and deadlines are read, so a set() from here on (settings
+            # change, stop) is never lost - it just makes the wait below return at once
+            self.wake_event.clear()
+            now = time.monotonic()
             
-            # Wait for next poll
-            settings = self.settings_manager.get_settings()
-            interval = settings.get("poll_interval_seconds", 60)
-            self.stop_event.wait(interval)
+            if last_poll is None or now >= last_poll + self._poll_interval():
+                last_poll = now
+                try:
+                    self._poll_once()
+                except Exception as e:
+                    logger.error(f"Error in poll cycle: {e}")
+            
+            if last_valuation is None or now >= last_valuation + self._valuation_interval():
+                last_valuation = now
+                try:
+                    if self.valuator.is_enabled():
+                        self._start_valuation_run()
+                except Exception as e:
+                    logger.error(f"Error starting valuation cycle: {e}")
+            
+            if now >= next_flush:
+                next_flush = now + DB_FLUSH_INTERVAL_SECONDS
+                # Single place changes reach disk; on the writer thread so a compaction
+                # never delays the next poll, and skipped while the previous flush is still running
+                try:
+                    if self.flush_future is None or self.flush_future.done():
+                        self.flush_future = self.writer.submit(self._flush_safely)
+                except Exception as e:
+                    logger.error(f"Error starting database flush: {e}")
+            
+            # Sleep until the earliest deadline (or until woken)
+            next_due = min(last_poll + self._poll_interval(), last_valuation + self._valuation_interval(), next_flush)
+            remaining = next_due - time.monotonic()
+            if remaining > 0:
+                self.wake_event.wait(remaining)
+    
+    def _poll_interval(self):
+        """Current polling interval in seconds"""
+        return self.settings_manager.get_settings().get("poll_interval_seconds", 60)
+    
+    def _valuation_interval(self):
+        """Current valuation interval in seconds"""
+        return self.settings_manager.get_settings().get("openai", {}).get("valuation_interval_minutes", 60) * 60
+    
+    def _on_settings_changed(self):
+        """Wake the scheduler so changed intervals take effect immediately"""
+        self.wake_event.set()
     
     def _poll_once(self, page=None):
         """Perform one polling cycle"""
         page_info = f" (page {page})" if page else ""
         logger.info(f"Polling for new items{page_info}...")
         
+        # One settings snapshot for the whole cycle, passed down to every fetch
+        settings = self.settings_manager.get_settings()
+        
+        # Shutting down - every step below fetches or writes
+        if self.stop_event.is_set():
+            return
+        
         # Fetch listing page
-        html = self.fetcher.fetch_listing_page(page)
-        if not html:
+        html = self.fetcher.fetch_listing_page(page, settings)
+        if html is None:
             logger.warning(f"Failed to fetch listing page{page_info}")
             return
+        if html is LISTING_UNCHANGED:
+            logger.info(f"Listing unchanged since last poll{page_info}")
+            return
+        if not html:
+            logger.warning(f"Empty listing page{page_info}")
+            # Do not let the validators of an empty/broken response turn the next fetch into a 304
+            self.fetcher.forget_listing_validators()
+            return
         
         # Extract product IDs
         product_ids = ProductExtractor.extract_product_ids(html)
+        if not product_ids:
+            # A real listing always links items - treat this like the empty page above
+            logger.warning(f"No product IDs in listing page ({len(html)} bytes){page_info}")
+            self.fetcher.forget_listing_validators()
+            return
         logger.info(f"Found {len(product_ids)} product IDs{page_info}")
         
         # Check for new items
+        new_ids = self.database.filter_new(product_ids)
+        
+        # Fetch new items concurrently - the work is almost entirely waiting on the network
         new_count = 0
-        for product_id in product_ids:
-            if not self.database.item_exists(product_id):
-                logger.info(f"New item found: {product_id}")
-                
-                # Fetch item details
-                item_html = self.fetcher.fetch_item_page(product_id)
-                if not item_html:
-                    logger.warning(f"Failed to fetch item page for {product_id}")
-                    continue
-                
-                # Extract details
-                item_data = ProductExtractor.extract_product_details(item_html, product_id)
-                
-                # Download images
-                settings = self.settings_manager.get_settings()
-                if settings.get("images", {}).get("download_enabled", True):
-                    self._download_item_images(item_data)
-                
-                # Save to database
-                self.database.add_item(product_id, item_data)
-                new_count += 1
+        if new_ids:
+            concurrency = settings.get("fetch_concurrency", ITEM_FETCH_CONCURRENCY)
+            with ThreadPoolExecutor(max_workers=min(len(new_ids), concurrency)) as executor:
+                for item_data in executor.map(self._fetch_new_item, new_ids, repeat(settings)):
+                    if self.stop_event.is_set():
+                        continue
+                    if item_data:
+                        # Save to database
+                        self.database.add_item(item_data["id"], item_data)
+                        new_count += 1
+            if new_count < len(new_ids):
+                # Some items failed - refetch the full listing next time so they are retried
+                self.fetcher.forget_listing_validators()
         
         if new_count > 0:
             logger.info(f"Added {new_count} new items{page_info}")
         else:
             logger.info(f"No new items found{page_info}")
     
-    def _download_item_images(self, item_data):
+    def _fetch_new_item(self, product_id, settings):
+        """Fetch, extract and download images for one new item (runs in a worker thread)"""
+        if self.stop_event.is_set():
+            return None
+        try:
+            logger.info(f"New item found: {product_id}")
+            
+            # Fetch item details
+            item_html = self.fetcher.fetch_item_page(product_id, settings)
+            if not item_html:
+                logger.warning(f"Failed to fetch item page for {product_id}")
+                return None
+            
+            # Extract details
+            item_data = ProductExtractor.extract_product_details(item_html, product_id)
+            
+            # Download images (not once shutdown has started - the item is then dropped anyway)
+            if self.stop_event.is_set():
+                return None
+            if settings.get("images", {}).get("download_enabled", True):
+                self._download_item_images(item_data, settings)
+            
+            return item_data
+        except Exception as e:
+            logger.error(f"Error fetching new item {product_id}: {e}")
+            return None
+    
+    def _download_item_images(self, item_data, settings=None):
         """Download images for an item"""
-        settings = self.settings_manager.get_settings()
-        max_images = settings.get("images", {}).get("max_images_per_item", 5)
+        if settings is None:
+            settings = self.settings_manager.get_settings()
+        image_settings = settings.get("images", {})
+        max_images = image_settings.get("max_images_per_item", 5)
         
         item_id = item_data["id"]
         images = item_data.get("images", [])[:max_images]
+        if not images:
+            item_data["image_files"] = []
+            return
+        
+        # Spread files over subdirectories named by the ID's last two digits so no directory grows unbounded
+        # (image_files then holds "shard/filename", which the /images/ route serves as a path)
+        prefix = ""
+        if image_settings.get("shard_directories", True):
+            prefix = f"{item_id[-IMAGE_SHARD_DIGITS:]}/"
+            os.makedirs(os.path.join(self.config['images_dir'], prefix), exist_ok=True)
         
+        # Images of one item are independent, so download them in parallel
         downloaded = []
-        for idx, img_url in enumerate(images):
-            try:
-                # Create filename with case-insensitive extension handling
-                ext = img_url.split('.')[-1].split('?')[0].lower()
-                if ext not in ['jpg', 'jpeg', 'png', 'gif', 'webp']:
+        with ThreadPoolExecutor(max_workers=len(images)) as executor:
+            futures = []
+            for idx, img_url in enumerate(images):
+                # Create filename with case-insensitive extension handling (query string ignored)
+                ext = os.path.splitext(urlparse(img_url).path)[1][1:].lower()
+                if ext not in VALID_IMAGE_EXTENSIONS:
                     ext = 'jpg'
-                filename = f"{item_id}_{idx}.{ext}"
+                filename = f"{prefix}{item_id}_{idx}.{ext}"
                 filepath = os.path.join(self.config['images_dir'], filename)
-                
-                # Download
-                if self.fetcher.download_image(img_url, filepath):
-                    downloaded.append(filename)
-                    logger.info(f"Downloaded image {filename}")
-            except Exception as e:
-                logger.error(f"Error downloading image {img_url}: {e}")
+                futures.append((img_url, filename, executor.submit(self.fetcher.download_image, img_url, filepath, settings)))
+            
+            # Collect in submission order so image_files keeps the listing's image order
+            for img_url, filename, future in futures:
+                try:
+                    if future.result():
+                        downloaded.append(filename)
+                        logger.info(f"Downloaded image {filename}")
+                except Exception as e:
+                    logger.error(f"Error downloading image {img_url}: {e}")
         
         item_data["image_files"] = downloaded
     
-    def _valuation_loop(self):
-        """Valuation loop - runs hourly or on-demand"""
-        logger.info("Valuation loop started")
+    def _start_valuation_run(self):
+        """Run valuations on the background pool unless a run is already in progress
         
-        while self.running and not self.stop_event.is_set():
+        Returns:
+            bool: True if a new run was started
+        """
+        with self._valuation_lock:
+            if self.valuation_future and not self.valuation_future.done():
+                return False
+            self.valuation_future = self.background.submit(self._run_valuations_safely)
+            return True
+    
+    def run_in_background(self, fn, *args):
+        """Run fn(*args) on the background pool, logging (not losing) any exception"""
+        def job():
             try:
-                if self.valuator.is_enabled():
-                    self._run_valuations()
+                fn(*args)
             except Exception as e:
-                logger.error(f"Error in valuation loop: {e}")
-            
-            # Wait for next valuation cycle
-            settings = self.settings_manager.get_settings()
-            interval_minutes = settings.get("openai", {}).get("valuation_interval_minutes", 60)
-            self.stop_event.wait(interval_minutes * 60)
+                logger.error(f"Error in background job {fn.__name__}: {e}")
+        return self.background.submit(job)
+    
+    def _flush_safely(self):
+        """Writer thread body - flush the database, logging instead of raising"""
+        try:
+            self.database.flush()
+        except Exception as e:
+            logger.error(f"Error flushing database: {e}")
+    
+    def _run_valuations_safely(self):
+        """Valuation run body - logs instead of raising"""
+        try:
+            self._run_valuations()
+        except Exception as e:
+            logger.error(f"Error in valuation cycle: {e}")
     
     def _run_valuations(self):
         """Run valuations for items that need it"""
@@ -750,34 +1707,50 @@ class ToriBot:
         
         logger.info(f"Valuating {len(items_to_valuate)} items...")
         
-        for item_id, item in items_to_valuate:
-            if not self.running:
-                break
-            
-            try:
-                valuation = self.valuator.valuate_item(item)
-                if valuation:
-                    # Work on a copy to avoid mutating shared database state outside its lock
-                    updated_item = dict(item)
-                    updated_item["valuation"] = valuation
-                    updated_item["updated_at"] = datetime.now().isoformat()
-                    self.database.add_item(item_id, updated_item)
-                    logger.info(f"Valuated item {item_id}")
-                
-                # Small delay between API calls
-                time.sleep(2)
-            except Exception as e:
-                logger.error(f"Error valuating item {item_id}: {e}")
+        # Past valuations are the cache's persistence - load them into it on the first run
+        if not self._valuation_cache_seeded:
+            self._valuation_cache_seeded = True
+            cached = self.valuator.remember_valuations(self.database.get_all_items())
+            logger.info(f"Valuation cache seeded with {cached} stored valuations")
+        
+        # Valuations are almost entirely waiting on the API: run a few at once,
+        # with request starts spaced out to stay clear of rate limits
+        settings = self.settings_manager.get_settings()
+        concurrency = settings.get("openai", {}).get("concurrency", VALUATION_CONCURRENCY)
+        limiter = RateLimiter(VALUATION_MIN_INTERVAL_SECONDS)
+        # Items valuated in one cycle share its updated_at timestamp
+        cycle_timestamp = datetime.now().isoformat()
+        with ThreadPoolExecutor(max_workers=min(len(items_to_valuate), concurrency)) as executor:
+            list(executor.map(self._valuate_one, items_to_valuate, repeat(limiter), repeat(settings), repeat(cycle_timestamp)))
         
+        self.database.flush()
         self.last_valuation_time = datetime.now()
         logger.info("Valuation cycle completed")
     
+    def _valuate_one(self, entry, limiter, settings, updated_at):
+        """Valuate and store one (item_id, item) entry (runs in a worker thread)"""
+        item_id, item = entry
+        if not self.running or not limiter.wait(self.stop_event):
+            return
+        
+        try:
+            valuation = self.valuator.valuate_item(item, settings)
+            if valuation:
+                self.database.update_fields(item_id, {
+                    "valuation": valuation,
+                    "updated_at": updated_at
+                })
+                logger.info(f"Valuated item {item_id}")
+        except Exception as e:
+            logger.error(f"Error valuating item {item_id}: {e}")
+    
     def trigger_valuations(self):
         """Manually trigger valuations"""
         if not self.valuator.is_enabled():
             return {"success": False, "message": "OpenAI is not enabled"}
         
-        Thread(target=self._run_valuations, daemon=True).start()
+        if not self._start_valuation_run():
+            return {"success": False, "message": "Valuation already running"}
         return {"success": True, "message": "Valuation started"}
     
     def fetch_multiple_pages(self, num_products):
@@ -788,12 +1761,64 @@ class ToriBot:
         
         logger.info(f"Fetching approximately {num_products} products from {num_pages} pages...")
         
-        for page_num in range(1, num_pages + 1):
+        def fetch_page(page_num):
+            # Queued pages are skipped once shutdown starts
+            if self.stop_event.is_set():
+                return
             try:
                 self._poll_once(page=page_num)
                 logger.info(f"Completed fetching page {page_num}/{num_pages}")
             except Exception as e:
                 logger.error(f"Error fetching page {page_num}: {e}")
         
+        # Pages are independent - overlap their network waits
+        with ThreadPoolExecutor(max_workers=max(1, min(num_pages, PAGE_FETCH_CONCURRENCY))) as executor:
+            list(executor.map(fetch_page, range(1, num_pages + 1)))
+        
         logger.info(f"Multi-page fetch completed: processed {num_pages} pages")
         return {"success": True, "pages_fetched": num_pages}
+    
+    def refresh_items(self, items):
+        """Re-fetch and re-extract the given items in parallel (blocking; run it in a background thread)"""
+        settings = self.settings_manager.get_settings()
+        concurrency = settings.get("fetch_concurrency", ITEM_FETCH_CONCURRENCY)
+        if items:
+            with ThreadPoolExecutor(max_workers=min(len(items), concurrency), thread_name_prefix='refresh') as executor:
+                list(executor.map(self._refresh_one, items, repeat(settings)))
+        
+        self.database.flush()
+        logger.info(f"Completed refreshing {len(items)} items")
+    
+    def _refresh_one(self, item, settings):
+        """Refresh a single stored item (runs in a worker thread)"""
+        # Let a shutdown cancel the rest of a long refresh quickly
+        if self.stop_event.is_set():
+            return
+        try:
+            product_id = item.get('id')
+            if not product_id:
+                return
+            
+            # Fetch latest data for this item
+            item_html = self.fetcher.fetch_item_page(product_id, settings)
+            if not item_html:
+                logger.warning(f"Failed to fetch updated data for {product_id}")
+                return
+            
+            # Extract updated details
+            updated_data = ProductExtractor.extract_product_details(item_html, product_id)
+            
+            # Refresh images if downloading is enabled
+            if settings.get("images", {}).get("download_enabled", True):
+                image_urls = updated_data.get('images', [])
+                if image_urls:
+                    self._download_item_images(updated_data, settings)
+                    logger.info(f"Downloaded/refreshed {len(image_urls)} images for {product_id}")
+            
+            # Update the item in database
+            if self.stop_event.is_set():
+                return
+            self.database.add_item(product_id, updated_data)
+            logger.info(f"Updated item {product_id}")
+        except Exception as e:
+            logger.error(f"Error refreshing item {item.get('id')}: {e}")
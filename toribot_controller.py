@@ -8,8 +8,51 @@ import os
 import sys
 import time
 import subprocess
+import select
 import signal
+import webbrowser
 from datetime import datetime
+from threading import Thread, Lock, Event
+from collections import deque
+from itertools import islice
+from typing import NamedTuple
+
+# How long start_bot waits for a bot to come up, and how often it checks
+START_TIMEOUT_SECONDS = 2.0
+START_POLL_SECONDS = 0.05
+# Grace period before a stopping bot is killed. ToriBot.stop() waits for requests already in flight
+# before its final database compaction: a Tori.fi fetch can take request_timeout_seconds (15) x 3
+# attempts plus retry backoff (~50 s), an OpenAI call OPENAI_TIMEOUT_SECONDS (30) x 3 attempts (~95 s).
+# The poll and the valuation run are drained side by side, so the worst case with default settings
+# is the longer of the two plus the compaction
+STOP_TIMEOUT_SECONDS = 120
+
+# Windows has no SIGTERM for other processes (terminate() is TerminateProcess, a hard kill),
+# so bots get their own process group there and are stopped with CTRL_BREAK_EVENT instead
+if os.name == 'nt':
+    BOT_CREATION_FLAGS = subprocess.CREATE_NEW_PROCESS_GROUP
+    STOP_SIGNAL = signal.CTRL_BREAK_EVENT
+else:
+    BOT_CREATION_FLAGS = 0
+    STOP_SIGNAL = signal.SIGTERM
+
+
+class BotConfig(NamedTuple):
+    """Script, web GUI port and listing type of a bot"""
+    file: str
+    port: int
+    description: str
+
+
+BOTS = {
+    "Toribot": BotConfig("toribot.py", 8788, "Free Items (Annataan)"),
+    "Ostobotti": BotConfig("ostobotti.py", 8789, "Wanted/Buying (Ostetaan)"),
+}
+
+# Logged once the web server has bound its port: by waitress, or by the Flask development
+# server fallback. The bots' own "Starting web server" line comes before the bind, so it
+# would report a bot whose port is taken as started
+SERVER_STARTED_MARKERS = ("Serving on http://", "Running on http://")
 
 # ANSI color codes for terminal
 class Colors:
@@ -22,46 +65,88 @@ class Colors:
     ENDC = '\033[0m'
     BOLD = '\033[1m'
     UNDERLINE = '\033[4m'
+    # Erase display + cursor home
+    CLEAR = '\033[2J\033[H'
+
+
+def enable_ansi():
+    """Make sure the terminal interprets ANSI sequences; returns False if it cannot
+
+    Unix terminals always do. Windows 10+ consoles need virtual terminal processing switched on.
+    """
+    if os.name != 'nt':
+        return True
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+        mode = ctypes.c_uint32()
+        if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            return False
+        # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+        return bool(kernel32.SetConsoleMode(handle, mode.value | 0x0004))
+    except Exception:
+        return False
+
 
 class ToribotController:
     def __init__(self):
         self.running_process = None
         self.running_bot = None
-        self.log_lines = []
         self.max_log_lines = 100
+        # Ring buffer - appending past max_log_lines drops the oldest line in O(1)
+        self.log_lines = deque(maxlen=self.max_log_lines)
+        # Filled continuously by the output reader thread, so reading logs never blocks the menu
+        self._log_lock = Lock()
+        self._reader_thread = None
+        # Set by the reader thread once the bot logs one of SERVER_STARTED_MARKERS
+        self._server_started = Event()
+        self._ansi = enable_ansi()
+        
+        # Constant screen parts, formatted once and written in one go on every redraw
+        self._banner_text = (
+            f"{Colors.BOLD}{Colors.CYAN}\n"
+            f"{'=' * 60}\n"
+            "        🤖 TORIBOT CONTROLLER 🤖\n"
+            f"{'=' * 60}\n"
+            f"{Colors.ENDC}\n"
+        )
+        # Full header for each possible running_bot (None when idle)
+        separator = f"{Colors.CYAN}{'=' * 60}{Colors.ENDC}\n\n"
+        self._header_text = {
+            bot_name: f"{self._banner_text}Status: {Colors.GREEN}RUNNING{Colors.ENDC} | Active Bot: {Colors.BOLD}{bot_name}{Colors.ENDC}\n{separator}"
+            for bot_name in BOTS
+        }
+        self._header_text[None] = f"{self._banner_text}Status: {Colors.YELLOW}IDLE{Colors.ENDC} | No bot running\n{separator}"
+        self._menu_text = "\n".join([
+            f"{Colors.BOLD}Main Menu:{Colors.ENDC}",
+            f"  {Colors.GREEN}1.{Colors.ENDC} Start Toribot (Free Items - Annataan)",
+            f"  {Colors.GREEN}2.{Colors.ENDC} Start Ostobotti (Wanted/Buying - Ostetaan)",
+            f"  {Colors.YELLOW}3.{Colors.ENDC} Stop Running Bot",
+            f"  {Colors.BLUE}4.{Colors.ENDC} View Logs (Last 20 lines)",
+            f"  {Colors.BLUE}5.{Colors.ENDC} View Status",
+            f"  {Colors.BLUE}6.{Colors.ENDC} Open Web GUI",
+            f"  {Colors.RED}0.{Colors.ENDC} Exit",
+            "", ""
+        ])
     
     def clear_screen(self):
         """Clear terminal screen"""
-        os.system('clear' if os.name != 'nt' else 'cls')
+        if self._ansi:
+            # Plain escape sequence - no clear/cls process per redraw
+            sys.stdout.write(Colors.CLEAR)
+            sys.stdout.flush()
+        else:
+            os.system('cls')
     
     def print_header(self):
         """Print application header"""
-        print(f"{Colors.BOLD}{Colors.CYAN}")
-        print("=" * 60)
-        print("        🤖 TORIBOT CONTROLLER 🤖")
-        print("=" * 60)
-        print(f"{Colors.ENDC}")
-        
-        if self.running_bot:
-            status = f"{Colors.GREEN}RUNNING{Colors.ENDC}"
-            print(f"Status: {status} | Active Bot: {Colors.BOLD}{self.running_bot}{Colors.ENDC}")
-        else:
-            status = f"{Colors.YELLOW}IDLE{Colors.ENDC}"
-            print(f"Status: {status} | No bot running")
-        
-        print(f"{Colors.CYAN}{'=' * 60}{Colors.ENDC}\n")
+        sys.stdout.write(self._header_text[self.running_bot])
     
     def print_menu(self):
         """Print main menu"""
-        print(f"{Colors.BOLD}Main Menu:{Colors.ENDC}")
-        print(f"  {Colors.GREEN}1.{Colors.ENDC} Start Toribot (Free Items - Annataan)")
-        print(f"  {Colors.GREEN}2.{Colors.ENDC} Start Ostobotti (Wanted/Buying - Ostetaan)")
-        print(f"  {Colors.YELLOW}3.{Colors.ENDC} Stop Running Bot")
-        print(f"  {Colors.BLUE}4.{Colors.ENDC} View Logs (Last 20 lines)")
-        print(f"  {Colors.BLUE}5.{Colors.ENDC} View Status")
-        print(f"  {Colors.BLUE}6.{Colors.ENDC} Open Web GUI")
-        print(f"  {Colors.RED}0.{Colors.ENDC} Exit")
-        print()
+        sys.stdout.write(self._menu_text)
+        sys.stdout.flush()
     
     def start_bot(self, bot_name):
         """Start a bot process"""
@@ -70,7 +155,8 @@ class ToribotController:
             print(f"{Colors.YELLOW}Please stop it first (option 3){Colors.ENDC}")
             return False
         
-        bot_file = "toribot.py" if bot_name == "Toribot" else "ostobotti.py"
+        config = BOTS[bot_name]
+        bot_file = config.file
         
         if not os.path.exists(bot_file):
             print(f"{Colors.RED}Error: {bot_file} not found!{Colors.ENDC}")
@@ -85,18 +171,33 @@ class ToribotController:
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
                 text=True,
-                bufsize=1
+                bufsize=1,
+                creationflags=BOT_CREATION_FLAGS
             )
             
             self.running_bot = bot_name
             
-            # Wait a moment and check if it started successfully
-            time.sleep(2)
+            # Drain the bot's output in the background
+            with self._log_lock:
+                self.log_lines.clear()
+            self._server_started.clear()
+            self._reader_thread = Thread(target=self._read_output, args=(self.running_process,), daemon=True)
+            self._reader_thread.start()
+            
+            # Wait until the bot is serving, exits, or the timeout runs out - whichever comes first
+            deadline = time.monotonic() + START_TIMEOUT_SECONDS
+            while self.running_process.poll() is None and time.monotonic() < deadline:
+                if self._server_started.wait(START_POLL_SECONDS):
+                    break
             
             if self.running_process.poll() is None:
-                print(f"{Colors.GREEN}✓ {bot_name} started successfully!{Colors.ENDC}")
-                port = "8788" if bot_name == "Toribot" else "8789"
-                print(f"{Colors.CYAN}Web GUI available at: http://127.0.0.1:{port}{Colors.ENDC}")
+                if self._server_started.is_set():
+                    print(f"{Colors.GREEN}✓ {bot_name} started successfully!{Colors.ENDC}")
+                    print(f"{Colors.CYAN}Web GUI available at: http://127.0.0.1:{config.port}{Colors.ENDC}")
+                else:
+                    # Still running but not serving - slow start, or a failed bind while the bot shuts down
+                    print(f"{Colors.YELLOW}⚠ {bot_name} is running but its web server is not up yet{Colors.ENDC}")
+                    print(f"{Colors.YELLOW}Check the logs (option 4) - port {config.port} may already be in use{Colors.ENDC}")
                 return True
             else:
                 print(f"{Colors.RED}✗ {bot_name} failed to start{Colors.ENDC}")
@@ -110,6 +211,44 @@ class ToribotController:
             self.running_bot = None
             return False
     
+    def _read_output(self, process):
+        """Reader thread body - collect the bot's output lines until its stdout closes"""
+        try:
+            for line in process.stdout:
+                line = line.strip()
+                with self._log_lock:
+                    self.log_lines.append(line)
+                if not self._server_started.is_set() and any(marker in line for marker in SERVER_STARTED_MARKERS):
+                    self._server_started.set()
+        except (OSError, ValueError):
+            # Pipe closed while the bot was being stopped
+            pass
+    
+    def _wait_for_exit(self, timeout):
+        """Wait up to timeout seconds for the bot process to exit; returns True if it did
+        
+        Sleeps in the kernel on a pidfd (Linux 5.3+, Python 3.9+) instead of
+        Popen.wait()'s sleep/poll loop, falling back to Popen.wait() elsewhere.
+        """
+        try:
+            fd = os.pidfd_open(self.running_process.pid)
+        except (AttributeError, OSError):
+            try:
+                self.running_process.wait(timeout=timeout)
+                return True
+            except subprocess.TimeoutExpired:
+                return False
+        try:
+            poller = select.poll()
+            poller.register(fd, select.POLLIN)
+            if not poller.poll(timeout * 1000):
+                return False
+        finally:
+            os.close(fd)
+        # Exited - reap it
+        self.running_process.wait()
+        return True
+    
     def stop_bot(self):
         """Stop the running bot"""
         if not self.running_process:
@@ -119,14 +258,13 @@ class ToribotController:
         try:
             print(f"{Colors.CYAN}Stopping {self.running_bot}...{Colors.ENDC}")
             
-            # Send SIGINT (Ctrl+C) for graceful shutdown
-            self.running_process.send_signal(signal.SIGINT)
+            # SIGTERM (CTRL_BREAK_EVENT on Windows) - both bots shut down gracefully on it, like on Ctrl+C
+            self.running_process.send_signal(STOP_SIGNAL)
             
-            # Wait for process to terminate (max 10 seconds)
-            try:
-                self.running_process.wait(timeout=10)
+            # Wait for process to terminate
+            if self._wait_for_exit(STOP_TIMEOUT_SECONDS):
                 print(f"{Colors.GREEN}✓ {self.running_bot} stopped successfully{Colors.ENDC}")
-            except subprocess.TimeoutExpired:
+            else:
                 # Force kill if graceful shutdown failed
                 self.running_process.kill()
                 self.running_process.wait()
@@ -149,23 +287,10 @@ class ToribotController:
         print(f"{Colors.BOLD}Last {num_lines} log lines from {self.running_bot}:{Colors.ENDC}")
         print(f"{Colors.CYAN}{'-' * 60}{Colors.ENDC}")
         
-        try:
-            # Read available output (limited to prevent blocking)
-            lines_read = 0
-            max_reads = 100  # Prevent infinite loop
-            while lines_read < max_reads:
-                line = self.running_process.stdout.readline()
-                if not line:
-                    break
-                self.log_lines.append(line.strip())
-                if len(self.log_lines) > self.max_log_lines:
-                    self.log_lines.pop(0)
-                lines_read += 1
-        except:
-            pass
-        
-        # Display last N lines
-        for line in self.log_lines[-num_lines:]:
+        # Display last N lines collected by the reader thread - walked from the tail, so only N are visited
+        with self._log_lock:
+            lines = list(islice(reversed(self.log_lines), num_lines))
+        for line in reversed(lines):
             print(line)
         
         print(f"{Colors.CYAN}{'-' * 60}{Colors.ENDC}")
@@ -180,11 +305,9 @@ class ToribotController:
             print(f"  Active Bot: {Colors.GREEN}{self.running_bot}{Colors.ENDC}")
             print(f"  PID: {self.running_process.pid}")
             
-            port = "8788" if self.running_bot == "Toribot" else "8789"
-            bot_type = "Free Items (Annataan)" if self.running_bot == "Toribot" else "Wanted/Buying (Ostetaan)"
-            
-            print(f"  Type: {bot_type}")
-            print(f"  Web GUI: http://127.0.0.1:{port}")
+            config = BOTS[self.running_bot]
+            print(f"  Type: {config.description}")
+            print(f"  Web GUI: http://127.0.0.1:{config.port}")
             
             # Check if process is still alive
             if self.running_process.poll() is None:
@@ -203,35 +326,49 @@ class ToribotController:
         
         files_to_check = [
             ("products.json", "Toribot products"),
+            ("products.jsonl", "Toribot change log"),
             ("ostobotti_products.json", "Ostobotti products"),
+            ("ostobotti_products.jsonl", "Ostobotti change log"),
             ("settings.json", "Toribot settings"),
             ("ostobotti_settings.json", "Ostobotti settings")
         ]
         
         for filename, description in files_to_check:
-            if os.path.exists(filename):
-                size = os.path.getsize(filename)
-                mtime = datetime.fromtimestamp(os.path.getmtime(filename))
-                print(f"  {Colors.GREEN}✓{Colors.ENDC} {description}: {size} bytes (modified: {mtime.strftime('%Y-%m-%d %H:%M')})")
-            else:
+            # One stat() gives existence, size and mtime together
+            try:
+                st = os.stat(filename)
+            except FileNotFoundError:
                 print(f"  {Colors.YELLOW}✗{Colors.ENDC} {description}: Not found")
+                continue
+            mtime = datetime.fromtimestamp(st.st_mtime)
+            print(f"  {Colors.GREEN}✓{Colors.ENDC} {description}: {st.st_size} bytes (modified: {mtime.strftime('%Y-%m-%d %H:%M')})")
+            if filename.endswith('.jsonl') and st.st_size:
+                # products.json lags by these until the bot's next compaction
+                print(f"      {self._count_lines(filename)} changes not yet compacted into the products file")
         
         print(f"{Colors.CYAN}{'-' * 60}{Colors.ENDC}")
     
+    @staticmethod
+    def _count_lines(filename):
+        """Count the records of a change log (one per line), reading it in large blocks"""
+        count = 0
+        with open(filename, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                count += block.count(b'\n')
+        return count
+    
     def open_gui(self):
         """Open web GUI in browser"""
         if not self.running_bot:
             print(f"{Colors.YELLOW}No bot is currently running. Please start a bot first.{Colors.ENDC}")
             return
         
-        port = "8788" if self.running_bot == "Toribot" else "8789"
-        url = f"http://127.0.0.1:{port}"
+        url = f"http://127.0.0.1:{BOTS[self.running_bot].port}"
         
         print(f"{Colors.CYAN}Opening web GUI: {url}{Colors.ENDC}")
         
         # Try to open in browser
         try:
-            import webbrowser
             webbrowser.open(url)
             print(f"{Colors.GREEN}✓ Browser opened{Colors.ENDC}")
         except:
@@ -300,7 +437,7 @@ def main():
     print(f"{Colors.BOLD}{Colors.CYAN}Toribot Controller Starting...{Colors.ENDC}\n")
     
     # Check if bot files exist
-    if not os.path.exists("toribot.py") or not os.path.exists("ostobotti.py"):
+    if not all(os.path.exists(bot_file) for bot_file in (config.file for config in BOTS.values())):
         print(f"{Colors.RED}Error: Bot files not found!{Colors.ENDC}")
         print("Please run this script from the toribot directory")
         sys.exit(1)
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Toribot Routes - Shared Flask routes for Tori.fi monitoring bots
+Registered by both toribot.py and ostobotti.py; per-bot differences come from app.config:
+    BOT: the running ToriBot instance
+    GUI_FILE: GUI HTML file served at /
+    IMAGES_DIR: directory of downloaded images served at /images/
+    EXPORT_PREFIX: filename prefix for CSV exports
+"""
+
+import csv
+import time
+from itertools import count
+
+from toribot_base import (
+    Blueprint, Response, current_app, jsonify, request, send_from_directory,
+    orjson, logger, IMAGE_CACHE_CONTROL, STATIC_CACHE_CONTROL, ResponseCache, EXPORT_FIELDNAMES, stream_csv
+)
+
+bp = Blueprint('toribot', __name__)
+
+# Serialized /api/products and /api/health bodies, rebuilt only when the data changes
+products_cache = ResponseCache()
+health_cache = ResponseCache()
+
+# Per-process export counter appended to CSV filenames, so saves within the same second do not clobber each other
+export_sequence = count(1)
+
+# Constant part of the /api/health body, keyed by openai_enabled; only the count and timestamp vary
+HEALTH_PREFIXES = {
+    enabled: b'{"success":true,"status":"running","version":"2.0.0","openai_enabled":'
+             + (b'true' if enabled else b'false') + b',"products_count":'
+    for enabled in (True, False)
+}
+
+
+def get_bot():
+    """Get the bot instance of the current app (None until main() has started it)"""
+    return current_app.config.get('BOT')
+
+
+def send_static(directory, filename):
+    """Send a GUI/static file as a conditional response that browsers revalidate"""
+    response = send_from_directory(directory, filename, conditional=True)
+    response.headers['Cache-Control'] = STATIC_CACHE_CONTROL
+    return response
+
+
+@bp.route('/')
+def index():
+    """Serve main GUI"""
+    return send_static('.', current_app.config['GUI_FILE'])
+
+
+@bp.route('/styles.css')
+def styles():
+    """Serve CSS"""
+    return send_static('.', 'styles.css')
+
+
+@bp.route('/api/products')
+def get_products():
+    """Get all products"""
+    logger.info("API call: /api/products")
+    try:
+        bot = get_bot()
+        # Read the version first: a write racing with this request then only causes an extra rebuild
+        version = bot.database.version
+        # Sorted by discovered_at descending
+        items = bot.database.get_all_items_newest_first()
+        logger.info(f"Returning {len(items)} products to frontend")
+        return products_cache.response(
+            version, lambda: orjson.dumps({"success": True, "products": items}, option=orjson.OPT_NON_STR_KEYS)
+        )
+    except Exception as e:
+        logger.error(f"Error getting products: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@bp.route('/api/settings', methods=['GET'])
+def get_settings():
+    """Get current settings"""
+    try:
+        settings = get_bot().settings_manager.get_settings()
+        # Mask API key - only the openai section is copied, the rest is shared read-only
+        settings_copy = dict(settings)
+        if settings_copy.get("openai", {}).get("api_key"):
+            settings_copy["openai"] = {**settings_copy["openai"], "api_key": "***MASKED***"}
+        return jsonify({"success": True, "settings": settings_copy})
+    except Exception as e:
+        logger.error(f"Error getting settings: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@bp.route('/api/settings', methods=['POST'])
+def update_settings():
+    """Update settings"""
+    try:
+        new_settings = request.json
+        if not new_settings:
+            return jsonify({"success": False, "error": "No settings provided"}), 400
+
+        get_bot().settings_manager.update_settings(new_settings)
+        return jsonify({"success": True, "message": "Settings updated"})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error updating settings: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@bp.route('/api/valuate', methods=['POST'])
+def trigger_valuation():
+    """Manually trigger OpenAI valuation"""
+    logger.info("API call: /api/valuate")
+    try:
+        result = get_bot().trigger_valuations()
+        logger.info("Valuation triggered successfully")
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Error triggering valuation: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@bp.route('/images/<path:filename>')
+def serve_image(filename):
+    """Serve downloaded images"""
+    response = send_from_directory(current_app.config['IMAGES_DIR'], filename, conditional=True)
+    response.headers['Cache-Control'] = IMAGE_CACHE_CONTROL
+    return response
+
+
+@bp.route('/v2')
+@bp.route('/v2/')
+def v2_index():
+    """Serve v2 GUI"""
+    return send_static('static/v2', 'index.html')
+
+
+@bp.route('/static/v2/<path:path>')
+def serve_v2_static(path):
+    """Serve v2 static files"""
+    return send_static('static/v2', path)
+
+
+@bp.route('/api/health')
+def get_health():
+    """Get bot health status"""
+    try:
+        bot = get_bot()
+        version = bot.database.version
+        settings = bot.settings_manager.get_settings()
+        openai_enabled = settings.get("openai", {}).get("enabled", False)
+
+        def build_body():
+            # Both read off the database's own bookkeeping - no pass over the items
+            count = bot.database.count_items()
+            last_update = bot.database.max_discovered_at()
+
+            return b''.join((
+                HEALTH_PREFIXES[bool(openai_enabled)], str(count).encode(),
+                b',"last_update":', orjson.dumps(last_update), b'}'
+            ))
+
+        return health_cache.response((version, openai_enabled), build_body)
+    except Exception as e:
+        logger.error(f"Error getting health: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@bp.route('/api/fetch', methods=['POST'])
+def fetch_products():
+    """Trigger product fetching"""
+    logger.info("API call: /api/fetch")
+    try:
+        bot = get_bot()
+        if bot:
+            data = request.json or {}
+            num_products = data.get('num_products', None)
+
+            if num_products and num_products > 0:
+                # Multi-page fetch
+                logger.info(f"Multi-page fetch requested for ~{num_products} products")
+                bot.run_in_background(bot.fetch_multiple_pages, num_products)
+                return jsonify({"success": True, "message": f"Fetching ~{num_products} products in background", "multi_page": True})
+            else:
+                # Single page fetch (original behavior)
+                bot._poll_once()
+                items = bot.database.get_all_items()
+                logger.info(f"Product fetch triggered successfully, total items: {len(items)}")
+                return jsonify({"success": True, "message": "Fetch completed", "count": len(items)})
+        else:
+            return jsonify({"success": False, "error": "Bot not initialized"}), 500
+    except Exception as e:
+        logger.error(f"Error triggering fetch: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@bp.route('/api/save', methods=['POST'])
+def save_products():
+    """Save products to CSV (or, with ?download=1, stream the CSV to the client instead)"""
+    try:
+        bot = get_bot()
+        if bot:
+            count = bot.database.count_items()
+            timestamp = time.strftime('%Y%m%d_%H%M%S')
+            filename = f"{current_app.config['EXPORT_PREFIX']}_{timestamp}_{next(export_sequence)}.csv"
+
+            if request.args.get('download'):
+                # Download straight to the browser, row by row, without a server-side file
+                return Response(
+                    stream_csv(bot.database.iter_export_rows()),
+                    mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'}
+                )
+
+            # Write rows straight to the (buffered) file - no in-memory copy of the whole CSV
+            with open(filename, 'w', encoding='utf-8', newline='', buffering=1 << 20) as f:
+                writer = csv.writer(f)
+                writer.writerow(EXPORT_FIELDNAMES)
+                writer.writerows(bot.database.iter_export_rows())
+
+            return jsonify({"success": True, "filename": filename, "count": count})
+        else:
+            return jsonify({"success": False, "error": "Bot not initialized"}), 500
+    except Exception as e:
+        logger.error(f"Error saving products: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@bp.route('/api/refresh-all', methods=['POST'])
+def refresh_all():
+    """Refresh all existing items to check for updates"""
+    logger.info("API call: /api/refresh-all")
+    try:
+        bot = get_bot()
+        if bot:
+            items = bot.database.get_all_items()
+            logger.info(f"Refreshing {len(items)} items in background")
+
+            # Run refresh on the bot's background pool
+            bot.run_in_background(bot.refresh_items, items)
+
+            return jsonify({"success": True, "message": f"Refreshing {len(items)} items in background", "count": len(items)})
+        else:
+            return jsonify({"success": False, "error": "Bot not initialized"}), 500
+    except Exception as e:
+        logger.error(f"Error triggering refresh: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@bp.route('/api/fetch-images', methods=['POST'])
+def fetch_images():
+    """Trigger image downloading"""
+    try:
+        bot = get_bot()
+        if bot:
+            items = bot.database.get_all_items()
+            count = 0
+            for item in items:
+                if item.get('image_urls') and not item.get('image_files'):
+                    count += 1
+            return jsonify({"success": True, "message": f"Image fetch triggered for {count} items", "count": count})
+        else:
+            return jsonify({"success": False, "error": "Bot not initialized"}), 500
+    except Exception as e:
+        logger.error(f"Error triggering image fetch: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500